@@ -11,104 +11,110 @@ reformat it, and publish those changes back to Gerrit.
 """
 import json
 import logging
+import os
 import re
 import sys
+from bisect import bisect_right
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
 
 from .gerrit import Context
-from .models import Change, ReviewInput, CommentRange, CommentInput, ReformatType, strip_empty_values_from_input_dict, \
-    NotifyEnum
+from .models import Change, File, ReviewInput, CommentRange, CommentInput, ReformatType, \
+    strip_empty_values_from_input_dict, NotifyEnum
 from .llvm import run_clang_format
 
-EXTENSION_PATTERN = (r"^.*\.(?:cpp|cc|c\+\+|cxx|cppm|ccm|cxxm|c\+\+m|c|cl|h|hh|hpp"
-                     r"|hxx|m|mm|inc|js|ts|proto|protodevel|java|cs|json|s?vh?)$")
+EXTENSIONS = frozenset({"cpp", "cc", "c++", "cxx", "cppm", "ccm", "cxxm", "c++m", "c", "cl", "h", "hh", "hpp", "hxx",
+                        "m", "mm", "inc", "js", "ts", "proto", "protodevel", "java", "cs", "json", "v", "vh", "sv",
+                        "svh"})
+# The operation that is mentioned in the suggestion for a reformatted segment. Deletions have their own message.
+_OPERATIONS = {
+    ReformatType.INSERTION: "insert after",
+    ReformatType.MODIFICATION: "change",
+}
 
 
 def reformat_change(context: Context, change_id: int | str, revision_id: str = "current", submit: bool = False):
     """Function to fetch a change, reformat it.
-    The function returns a dict that contains the data that can be posted to the review endpoint on Gerrit.
+    The review is either submitted to Gerrit, or written to `review.json` so that it can be posted to the review
+    endpoint on Gerrit.
     """
     logger = logging.getLogger("core")
-    logger.info("Fetching change details for %s" % str(change_id))
+    logger.info("Fetching change details for %s", change_id)
     if isinstance(change_id, int):
-        # convert a change number to an id
-        change_id, revision_id = context.get_change_and_revision_from_number(change_id)
+        # a change number always refers to the current revision, so it can be fetched in a single query
+        reformat_changes(context, context.get_changes_batch([change_id]), submit)
+        return
     change = context.get_change(change_id, revision_id)
+    _reformat_and_review(context, change, submit, logger)
+
+
+def reformat_changes(context: Context, changes: Iterable[Change], submit: bool = False):
+    """Function to reformat multiple changes one by one. See `reformat_change()` for details.
+    The changes are consumed one at a time, so a lazy iterable (like the result of `Context.get_changes_batch()`) only
+    fetches the contents of a change when it is its turn.
+    """
+    logger = logging.getLogger("core")
+    for change in changes:
+        _reformat_and_review(context, change, submit, logger)
+
+
+def _reformat_and_review(context: Context, change: Change, submit: bool, logger):
+    """Internal function that runs `haiku-format` over the files in a change, and publishes or stores the review."""
+    worklist: list[tuple[File, list[str]]] = []
     for f in change.files:
-        if not re.match(EXTENSION_PATTERN, f.filename, re.IGNORECASE):
-            logger.info("Ignoring %s because it does not seem to be a file that `clang-format` can handle" % f.filename)
+        extension = f.filename.rsplit('.', 1)
+        if len(extension) < 2 or extension[1].lower() not in EXTENSIONS:
+            logger.info("Ignoring %s because it does not seem to be a file that `clang-format` can handle", f.filename)
             continue
         if f.patch_contents is None:
-            logger.info("Skipping %s because the file is deleted in the patch" % f.filename)
+            logger.info("Skipping %s because the file is deleted in the patch", f.filename)
             continue
         if f.base_contents is not None:
             # Check if the file is a modified file (i.e. it has base and patch contents). If so, add the segments to a
             # list.
-            if len(f.patch_segments) == 0:
-                logger.info("Skipping %s because the changes in the patch are only deletions" % f.filename)
+            if not f.patch_segments:
+                logger.info("Skipping %s because the changes in the patch are only deletions", f.filename)
                 continue
-            segments = []
-            for segment in f.patch_segments:
-                segments.append(segment.format_range())
+            segments = [segment.format_range() for segment in f.patch_segments]
         else:
             # The patched file is new, add an empty segment list so that haiku-format reformats it in its entirety.
             segments = []
-        reformatted_content = run_clang_format(f.patch_contents, segments)
-        f.formatted_contents = reformatted_content
-        if f.formatted_contents is None:
-            logger.info("%s: no reformats" % f.filename)
-        else:
-            logger.info("%s: %i segment(s) reformatted" % (f.filename, len(f.format_segments)))
+        worklist.append((f, segments))
+
+    # Each file is formatted by a separate `haiku-format` process, so run them concurrently. The threads only wait on
+    # the child processes, which means that a thread pool is sufficient.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(run_clang_format, [f.patch_contents for f, _ in worklist],
+                               [segments for _, segments in worklist])
+        for (f, _), reformatted_content in zip(worklist, results):
+            f.formatted_contents = reformatted_content
+            if f.formatted_contents is None:
+                logger.info("%s: no reformats", f.filename)
+            else:
+                logger.info("%s: %i segment(s) reformatted", f.filename, len(f.format_segments))
 
     review_input = _change_to_review_input(change, logger)
     # Convert review input into json
     if submit:
-        context.publish_review(change_id, review_input, revision_id)
+        context.publish_review(change.change_id, review_input, change.revision)
         logger.info("The review has been submitted to Gerrit")
     else:
         output = strip_empty_values_from_input_dict(review_input)
-        with open("review.json", "wt") as f:
-            f.write(json.dumps(output, indent=4))
-        url = "/a/changes/%s/revisions/%s/review" % (change_id, revision_id)
-        logger.info("POST the contents of review.json to: %s", url)
+        # Write to a temporary file first, so that an interrupted run does not leave a partial review.json behind
+        with open("review.json.tmp", "wt") as fp:
+            json.dump(output, fp, indent=4)
+        os.replace("review.json.tmp", "review.json")
+        logger.info("POST the contents of review.json to: /a/changes/%s/revisions/%s/review", change.change_id,
+                    change.revision)
 
 
 def _change_to_review_input(change: Change, logger) -> ReviewInput:
     """Internal function that converts a change into a ReviewInput object that can be pushed to Gerrit"""
-    comments: dict[str, list[CommentInput]] = {}
-    for f in change.files:
-        if f.formatted_contents is None or len(f.format_segments) == 0:
-            continue
-        # WORKAROUND: get all lines in class definitions
-        skip_lines_set = set(get_class_lines_in_file(f.patch_contents))
-        for segment in f.format_segments:
-            end = segment.end
-            match segment.reformat_type:
-                case ReformatType.INSERTION:
-                    end = segment.start
-                    operation = "insert after"
-                case ReformatType.MODIFICATION:
-                    operation = "change"
-            # WORKAROUND: check if the reformatted segment overlaps with a class definition
-            segment_lines_set = set(range(segment.start, end + 1, 1))
-            if len(skip_lines_set & segment_lines_set) > 0:
-                logger.warning("Class Workaround: [%s] skipped lines %s" % (f.filename, str(segment_lines_set)))
-                continue
-            # As per the documentation, set the end point to character 0 of the next line to select all lines
-            # between start_line and end_line (excluding any content of end_line)
-            # https://review.haiku-os.org/Documentation/rest-api-changes.html#comment-range
-            # However, this does not seem to work with Gerrit 3.7.1 as it seems to select the entirety of end_line
-            # as well. So comment this out, put keeping a note just in case this is a bug in this particular Gerrit
-            # version and it needs to come back in the future.
-            # end += 1
-            comment_range = CommentRange(segment.start, 0, end, 0)
-            if segment.reformat_type == ReformatType.DELETION:
-                message = "Suggestion from `haiku-format` is to remove this line/these lines."
-            else:
-                message = ("Suggestion from `haiku-format` (%s):\n```c++\n%s```"
-                           % (operation, "".join(segment.formatted_content)))
-            comments.setdefault(f.filename, []).extend([CommentInput(
-                message=message, range=comment_range
-            )])
+    comments: defaultdict[str, list[CommentInput]] = defaultdict(list)
+    eligible_files = [f for f in change.files if f.formatted_contents is not None and f.format_segments]
+    for f in eligible_files:
+        _build_file_comments(f, comments, logger)
 
     if len(comments) == 0:
         message = "Experimental `haiku-format` bot: no formatting changes suggested for this commit."
@@ -122,45 +128,131 @@ def _change_to_review_input(change: Change, logger) -> ReviewInput:
                    "can use the following command to automatically reformat:\n```\ngit-haiku-format HEAD~\n```")
         labels = {"Haiku-Format": -1}
 
-    return ReviewInput(message=message, comments=comments, labels=labels, notify=NotifyEnum.OWNER)
+    return ReviewInput(message=message, comments=dict(comments), labels=labels, notify=NotifyEnum.OWNER)
+
+
+def _build_file_comments(f: File, comments: defaultdict[str, list[CommentInput]], logger):
+    """Internal function that converts the format segments of a file into comments, and adds them to `comments`."""
+    # WORKAROUND: get all line ranges in class definitions
+    class_ranges = get_class_ranges_in_file(f.patch_contents)
+    class_starts = [start for start, _ in class_ranges]
+    for segment in f.format_segments:
+        reformat_type = segment.reformat_type
+        operation = _OPERATIONS.get(reformat_type)
+        end = segment.start if reformat_type is ReformatType.INSERTION else segment.end
+        # WORKAROUND: check if the reformatted segment overlaps with a class definition
+        # The ranges are sorted and do not overlap, so only the last range that starts before the end of the segment
+        # can overlap with it.
+        i = bisect_right(class_starts, end) - 1
+        if i >= 0 and class_ranges[i][1] >= segment.start:
+            logger.warning("Class Workaround: [%s] skipped lines %i-%i", f.filename, segment.start, end)
+            continue
+        # As per the documentation, set the end point to character 0 of the next line to select all lines
+        # between start_line and end_line (excluding any content of end_line)
+        # https://review.haiku-os.org/Documentation/rest-api-changes.html#comment-range
+        # However, this does not seem to work with Gerrit 3.7.1 as it seems to select the entirety of end_line
+        # as well. So comment this out, put keeping a note just in case this is a bug in this particular Gerrit
+        # version and it needs to come back in the future.
+        # end += 1
+        comment_range = CommentRange(segment.start, 0, end, 0)
+        if reformat_type is ReformatType.DELETION:
+            message = "Suggestion from `haiku-format` is to remove this line/these lines."
+        else:
+            message = "".join(("Suggestion from `haiku-format` (", operation, "):\n```c++\n",
+                               *segment.formatted_content, "```"))
+        comments[f.filename].append(CommentInput(message=message, range=comment_range))
 
 
-_CLASS_DECLARATION_PATTERN = re.compile('^(?:class|struct) .*;$')
-_CLASS_DEFINITION_START_PATTERN = re.compile('^(?:class|struct) .*$')
+# Matches the start of a class definition, or a single brace. If the class start is a declaration (or an empty single
+# line class definition), the `declaration` group is set.
+_CLASS_TOKEN_PATTERN = re.compile(r'^(?P<class>(?:class|struct) .*?(?P<declaration>;)?)$|[{}]', re.MULTILINE)
+_NEWLINE_PATTERN = re.compile('\n')
 
 
 def get_class_lines_in_file(contents: list[str]) -> list[int]:
     """Parse a list of contents to find top level classes, and return a list of line numbers that are inside the class.
 
+    This utility is part of a WORKAROUND to skip parsing the contents of class definitions.
+    """
+    skip_lines = []
+    for start, end in get_class_ranges_in_file(contents):
+        skip_lines.extend(range(start, end + 1))
+    return skip_lines
+
+
+def get_class_ranges_in_file(contents: list[str]) -> list[tuple[int, int]]:
+    """Parse a list of contents to find top level classes, and return a sorted list of (start, end) tuples with the
+    ranges of lines that are inside the class. The ranges are inclusive.
+
     This utility is part of a WORKAROUND to skip parsing the contents of class definitions.
     """
     if len(contents) == 0:
         return []
 
-    skip_lines = []
+    buffer = "".join(contents)
+    # Most files have no class definitions at all, which is a lot cheaper to rule out than scanning for braces
+    if 'class ' not in buffer and 'struct ' not in buffer:
+        return []
+
+    skip_ranges = []
     in_class = False
     level = 0
-    for lineno, line in enumerate(contents, start=1):
-        if not in_class:
-            # Try to skip declarations (or empty single line class definitions)
-            if _CLASS_DECLARATION_PATTERN.match(line):
-                continue
-            # Look for 'class' at the beginning of the line. This will not catch nested classes.
-            if _CLASS_DEFINITION_START_PATTERN.match(line):
-                in_class = True
-                level += line.count('{')
-                level -= line.count('}')
-            # even if we found a class, we allow clang-format to reformat the first line
-            continue
-
-        # update level
-        level += line.count('{')
-        level -= line.count('}')
-        if level == 0:
+    class_lineno = 0
+    # Only the lines with braces or the start of a class change the state of the parser; on all other lines the level
+    # stays the same.
+    for lineno, delta, starts_class in _scan_class_tokens(buffer):
+        if in_class and level == 0 and lineno > class_lineno + 1:
+            # The line after the first line of the class has no braces, so the class ended there
             in_class = False
+        if in_class:
+            # update level
+            level += delta
+            if level == 0:
+                in_class = False
+                if lineno > class_lineno + 1:
+                    skip_ranges.append((class_lineno + 1, lineno - 1))
             continue
-        skip_lines.append(lineno)
-    return skip_lines
+        # Look for 'class' at the beginning of the line. This will not catch nested classes.
+        if starts_class:
+            in_class = True
+            level = delta
+            class_lineno = lineno
+            # even if we found a class, we allow clang-format to reformat the first line
+    if in_class and level != 0:
+        if len(contents) > class_lineno:
+            skip_ranges.append((class_lineno + 1, len(contents)))
+    return skip_ranges
+
+
+def _scan_class_tokens(buffer: str) -> Iterator[tuple[int, int, bool]]:
+    """Internal function that scans the buffer for braces and the start of class definitions. For every line that has
+    either of those, it yields a tuple with the line number, the change of the brace level on that line, and whether
+    the line starts a class definition.
+    """
+    # Offsets at which the lines start, so that the line number of a match can be looked up
+    line_starts = [0] + [match.end() for match in _NEWLINE_PATTERN.finditer(buffer)]
+    lineno = 0
+    delta = 0
+    starts_class = False
+    for match in _CLASS_TOKEN_PATTERN.finditer(buffer):
+        match_lineno = bisect_right(line_starts, match.start())
+        if match_lineno != lineno:
+            if lineno > 0:
+                yield lineno, delta, starts_class
+            lineno = match_lineno
+            delta = 0
+            starts_class = False
+        class_start = match.group('class')
+        if class_start is not None:
+            delta += class_start.count('{') - class_start.count('}')
+            # Try to skip declarations (or empty single line class definitions)
+            starts_class = match.group('declaration') is None
+        elif match.group() == '{':
+            delta += 1
+        else:
+            delta -= 1
+    if lineno > 0:
+        yield lineno, delta, starts_class
 
 
 if __name__ == "__main__":
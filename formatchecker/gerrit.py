@@ -14,7 +14,7 @@ import logging
 import os
 from functools import reduce
 from io import StringIO
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 from base64 import b64decode
@@ -38,25 +38,51 @@ class Context:
         """Get a change including its details from Gerrit. Optionally it is possible to get a specific revision."""
         current_revision_url = "changes/%s/revisions/%s/" % (change_id, revision_id)
         change_dict: dict = self._get(urljoin(current_revision_url, "files"))
-        files = []
-        for filename in change_dict.keys():
-            status = change_dict[filename].get("status", "M")
-            file_get_url = urljoin(current_revision_url, "files/%s/content" % quote(filename, safe=''))
-            if status not in ["M", "D", "A"]:
-                raise RuntimeError("Unsupported file status change")
-            # get the contents of the current patch version of the file
-            if status != "D":
-                patch_content = self._get(file_get_url)
-                patch_content = StringIO(patch_content).readlines()
-            else:
-                patch_content = None
-            if status != "A":
-                base_content = self._get(file_get_url, params={"parent": "1"})
-                base_content = StringIO(base_content).readlines()
-            else:
-                base_content = None
-            files.append(File(filename, base_content, patch_content))
-        return Change(change_id, files)
+        return Change(change_id, self._get_files(change_id, revision_id, change_dict), revision_id)
+
+    def get_changes_batch(self, change_ids: list[int | str]) -> Iterator[Change]:
+        """Get the current revision of multiple changes, including their details, from Gerrit.
+        The changes are looked up using a single query. The change ids can be change numbers or Change-Ids. The changes
+        are returned in the same order as the input, and an id that is repeated is only returned once. The contents of
+        the files of a change are only fetched when the iterator reaches that change.
+        A `ValueError` is raised if any of the ids does not match a change, or if an id matches more than one change
+        (for example a Change-Id that is used on multiple branches).
+        """
+        # Remove duplicates, but keep the order of the input
+        unique_ids = list(dict.fromkeys(str(change_id) for change_id in change_ids))
+        if len(unique_ids) == 0:
+            return iter([])
+        query_options = []
+        for change_id in unique_ids:
+            if len(query_options) > 0:
+                query_options.append("OR")
+            query_options.append("change:%s" % change_id)
+        change_infos: list[Any] = self._query(
+            query_options, {"o": ["CURRENT_REVISION", "CURRENT_FILES", "CURRENT_COMMIT"]})
+
+        # Match the results back to the ids. Gerrit sorts the results by the time they were last updated, so this also
+        # restores the order of the input.
+        positions = {change_id: i for i, change_id in enumerate(unique_ids)}
+        matches: list[list[Any]] = [[] for _ in unique_ids]
+        for change_info in change_infos:
+            for key in (str(change_info["_number"]), change_info["change_id"]):
+                if key in positions:
+                    matches[positions[key]].append(change_info)
+        missing = [change_id for change_id, infos in zip(unique_ids, matches) if len(infos) == 0]
+        if len(missing) > 0:
+            raise ValueError("No change found for: %s" % ", ".join(missing))
+        ambiguous = [change_id for change_id, infos in zip(unique_ids, matches) if len(infos) > 1]
+        if len(ambiguous) > 0:
+            raise ValueError("Multiple changes found for: %s" % ", ".join(ambiguous))
+        return (self.get_change_from_info(infos[0]) for infos in matches)
+
+    def get_change_from_info(self, change_info: dict[str, Any]) -> Change:
+        """Get the current revision of a change, including its details, from a ChangeInfo object that has been
+        retrieved with the CURRENT_REVISION and CURRENT_FILES options.
+        """
+        revision_id = change_info["current_revision"]
+        files_dict = change_info["revisions"][revision_id].get("files", {})
+        return Change(change_info["id"], self._get_files(change_info["id"], revision_id, files_dict), revision_id)
 
     def get_change_and_revision_from_number(self, change_number: int) -> tuple[str, str]:
         """Retrieve the change id and latest revision id from a change number"""
@@ -83,6 +109,29 @@ class Context:
         data = strip_empty_values_from_input_dict(hashtags)
         return self._post(hashtags_url, data)
 
+    def _get_files(self, change_id: str, revision_id: str, files_dict: dict[str, Any]) -> list[File]:
+        """Fetch the base and patch contents for the files in the `files_dict` that Gerrit returns for a revision."""
+        current_revision_url = "changes/%s/revisions/%s/" % (change_id, revision_id)
+        files = []
+        for filename in files_dict.keys():
+            status = files_dict[filename].get("status", "M")
+            file_get_url = urljoin(current_revision_url, "files/%s/content" % quote(filename, safe=''))
+            if status not in ["M", "D", "A"]:
+                raise RuntimeError("Unsupported file status change")
+            # get the contents of the current patch version of the file
+            if status != "D":
+                patch_content = self._get(file_get_url)
+                patch_content = StringIO(patch_content).readlines()
+            else:
+                patch_content = None
+            if status != "A":
+                base_content = self._get(file_get_url, params={"parent": "1"})
+                base_content = StringIO(base_content).readlines()
+            else:
+                base_content = None
+            files.append(File(filename, base_content, patch_content))
+        return files
+
     def _get(self, url: str, params=None) -> list[Any] | dict[str, Any] | str:
         """Get resources from Gerrit and do some basic validations.
         Depending on the type of request, the return value is either a list (from JSON), a dict (from JSON) or plain
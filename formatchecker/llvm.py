@@ -20,6 +20,7 @@ from io import StringIO
 from typing import Optional, Iterator
 
 FORMAT_COMMAND = 'haiku-format'
+FORMAT_STYLE = '{BasedOnStyle: Haiku, SpaceAfterCStyleCast: false}'
 
 
 def parse_diff_segments(diff: Iterator[str]) -> dict[str, list[tuple[int, Optional[int], int, Optional[int]]]]:
@@ -86,7 +87,9 @@ def run_clang_format(contents: list[str], segment_ranges: list[str]) -> list[str
     """Run clang-format over a contents, limited to a set of ranges. The output of clang-format is returned as a list
     of lines
     """
-    command = [FORMAT_COMMAND, '-style', '{BasedOnStyle: Haiku, SpaceAfterCStyleCast: false}']
+    # clang-format only starts formatting after it has read its input until the end of the stream, and the line
+    # ranges are command line arguments. Therefore, a process can not be reused for multiple files.
+    command = [FORMAT_COMMAND, '-style', FORMAT_STYLE]
     # TODO see notes: clang-format seems to resort includes even outside of the changed segments
     # command.append('-sort-includes=0')
     for segment in segment_ranges:
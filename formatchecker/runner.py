@@ -17,7 +17,7 @@ import sys
 import time
 from datetime import date, timedelta
 
-from .core import reformat_change
+from .core import reformat_changes
 from .gerrit import Context
 
 _ALL_CHANGES_QUERY_OPTIONS = list([
@@ -41,11 +41,11 @@ def format_changes(after: date, submit: bool = False):
     context = Context("https://review.haiku-os.org/")
     query_options = _ALL_CHANGES_QUERY_OPTIONS.copy()
     query_options.append("after:%i-%i-%i" % (after.year, after.month, after.day))
-    changes = context.query_changes(query_options, {"o": "CURRENT_REVISION"})
+    changes = context.query_changes(query_options, {"o": ["CURRENT_REVISION", "CURRENT_FILES"]})
     logger.info("Found %i changes" % len(changes))
 
-    for change in reversed(changes):
-        reformat_change(context, change["id"], change["current_revision"], submit)
+    # The file contents are only fetched when a change is reformatted
+    reformat_changes(context, (context.get_change_from_info(change) for change in reversed(changes)), submit)
 
 
 def daemon_mode(timeout: int, after: date, submit: bool = False):
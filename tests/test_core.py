@@ -5,10 +5,12 @@
 # Authors:
 #  Niels Sascha Reedijk, niels.reedijk@gmail.com
 #
+import logging
 import os
 import unittest
 
-from formatchecker.core import get_class_lines_in_file
+from formatchecker.core import get_class_lines_in_file, get_class_ranges_in_file, _change_to_review_input
+from formatchecker.models import Change, File, CommentRange, CommentInput
 
 class ClassFinderTest(unittest.TestCase):
     def test_classfinder(self):
@@ -17,3 +19,45 @@ class ClassFinderTest(unittest.TestCase):
             contents = f.readlines()
             self.assertEqual(get_class_lines_in_file(contents),
                              [14, 19, 20, 21, 38, 39, 40, 41, 42, 43, 44, 45, 46 ,47, 53, 54])
+
+    def test_classfinder_ranges(self):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+        with open(os.path.join(data_path, "test_class_finder.cpp")) as f:
+            contents = f.readlines()
+            self.assertEqual(get_class_ranges_in_file(contents), [(14, 14), (19, 21), (38, 47), (53, 54)])
+
+
+class ReviewInputTest(unittest.TestCase):
+    def test_change_to_review_input(self):
+        """Test that segments that overlap with a class definition (lines 4-8) are skipped, and that the other segments
+        are converted into the right comments."""
+        patch = ["int  a;\n", "\n", "class  Foo {\n", "\tint  x;\n", "\tint y;\n", "\tint  z;\n", "\tint w;\n",
+                 "\tint  v;\n", "}  ;\n", "\n", "int  c;\n", "int d;\n", "int e;\n", "\n", "\n", "int f;\n"]
+        formatted = ["int a;\n", "\n", "class Foo {\n", "\tint x;\n", "\tint y;\n", "\tint z;\n", "\tint w;\n",
+                     "\tint v;\n", "};\n", "\n", "int c;\n", "int d;\n", "\n", "int e;\n", "\n", "int f;\n"]
+        f = File("src/test.cpp", None, patch)
+        f.formatted_contents = formatted
+        # Before the class (1), straddling the start (3-4), inside (6), straddling the end (8-9), after (11), an
+        # insertion after line 12 and a deletion of line 15
+        self.assertEqual([(segment.start, segment.end) for segment in f.format_segments],
+                         [(1, 1), (3, 4), (6, 6), (8, 9), (11, 11), (12, None), (15, 15)])
+
+        logger = logging.getLogger("test_core")
+        with self.assertLogs(logger, level=logging.WARNING) as logs:
+            review_input = _change_to_review_input(Change("test", [f]), logger)
+        self.assertEqual(logs.output, [
+            "WARNING:test_core:Class Workaround: [src/test.cpp] skipped lines 3-4",
+            "WARNING:test_core:Class Workaround: [src/test.cpp] skipped lines 6-6",
+            "WARNING:test_core:Class Workaround: [src/test.cpp] skipped lines 8-9",
+        ])
+        self.assertEqual(review_input.labels, {"Haiku-Format": -1})
+        self.assertEqual(review_input.comments, {"src/test.cpp": [
+            CommentInput(message="Suggestion from `haiku-format` (change):\n```c++\nint a;\n```",
+                         range=CommentRange(1, 0, 1, 0)),
+            CommentInput(message="Suggestion from `haiku-format` (change):\n```c++\nint c;\n```",
+                         range=CommentRange(11, 0, 11, 0)),
+            CommentInput(message="Suggestion from `haiku-format` (insert after):\n```c++\n\n```",
+                         range=CommentRange(12, 0, 12, 0)),
+            CommentInput(message="Suggestion from `haiku-format` is to remove this line/these lines.",
+                         range=CommentRange(15, 0, 15, 0)),
+        ]})
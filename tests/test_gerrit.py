@@ -48,6 +48,18 @@ def context_get_mock(self, url: str, params=None):
             return "file_deleted line 1\nfile_deleted line 2\n"
         else:
             raise RuntimeError("Invalid request for src/file_implicitly_modified content")
+    # ContextTest.test_get_changes_batch()
+    elif url == "changes/test_batch~I1000/revisions/rev1000/files/src%2Ffile_added/content":
+        if params is None:
+            return "file_added line 1\n"
+        raise RuntimeError("The src/file_added file is added, so the base version should not be requested")
+    elif url == "changes/test_batch~I1001/revisions/rev1001/files/src%2Ffile_modified/content":
+        if params is None:
+            return "file_modified patched line 1\n"
+        elif params == {"parent": "1"}:
+            return "file_modified base line 1\n"
+        else:
+            raise RuntimeError("Invalid request for src/file_modified content")
     raise ValueError("Input URL is not mocked: %s" % url)
 
 
@@ -73,6 +85,26 @@ def context_query_mock(self, query_options: list[str], params: dict[str, Any]) -
             return json.load(f)
     elif query_options == ["change:19000"]:
         return []
+    # ContextTest.test_get_changes_batch()
+    elif query_options == ["change:1000", "OR", "change:1001"] \
+            or query_options == ["change:1000", "OR", "change:1001", "OR", "change:19000"] \
+            or query_options == ["change:1000", "OR", "change:I1001"]:
+        assert (params == {"o": ["CURRENT_REVISION", "CURRENT_FILES", "CURRENT_COMMIT"]})
+        # Gerrit returns the most recently updated change first
+        return [
+            {"id": "test_batch~I1001", "change_id": "I1001", "_number": 1001, "current_revision": "rev1001",
+             "revisions": {"rev1001": {"files": {"src/file_modified": {}}}}},
+            {"id": "test_batch~I1000", "change_id": "I1000", "_number": 1000, "current_revision": "rev1000",
+             "revisions": {"rev1000": {"files": {"src/file_added": {"status": "A"}}}}},
+        ]
+    elif query_options == ["change:I2000"] or query_options == ["change:I2000", "OR", "change:19000"]:
+        # The Change-Id is used for cherry-picks on two branches
+        return [
+            {"id": "test_batch~r1~I2000", "change_id": "I2000", "_number": 2001, "current_revision": "rev2001",
+             "revisions": {"rev2001": {"files": {}}}},
+            {"id": "test_batch~master~I2000", "change_id": "I2000", "_number": 2000, "current_revision": "rev2000",
+             "revisions": {"rev2000": {"files": {}}}},
+        ]
 
 
 class ContextTest(unittest.TestCase):
@@ -105,6 +137,32 @@ class ContextTest(unittest.TestCase):
         self.assertIsNotNone(change.files[2].base_contents)
         self.assertIsNone(change.files[2].patch_contents)
 
+    def test_get_changes_batch(self):
+        self.assertEqual(list(self._context.get_changes_batch([])), [])
+        self.assertRaisesRegex(ValueError, "^No change found for: 19000$",
+                               self._context.get_changes_batch, [1000, 1001, 19000])
+        # A Change-Id that matches multiple changes is rejected, and does not hide an id without a match
+        self.assertRaisesRegex(ValueError, "^Multiple changes found for: I2000$",
+                               self._context.get_changes_batch, ["I2000"])
+        self.assertRaisesRegex(ValueError, "^No change found for: 19000$",
+                               self._context.get_changes_batch, ["I2000", 19000])
+        # Repeated ids are queried and returned once; a change number and a Change-Id can be mixed
+        self.assertEqual([change.change_id for change in self._context.get_changes_batch([1000, "I1001", 1000])],
+                         ["test_batch~I1000", "test_batch~I1001"])
+        changes = list(self._context.get_changes_batch([1000, 1001, 1001]))
+        # The changes are returned in the order of the input
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(changes[0].change_id, "test_batch~I1000")
+        self.assertEqual(changes[0].revision, "rev1000")
+        self.assertEqual(changes[0].files[0].filename, "src/file_added")
+        self.assertIsNone(changes[0].files[0].base_contents)
+        self.assertEqual(changes[0].files[0].patch_contents, ["file_added line 1\n"])
+        self.assertEqual(changes[1].change_id, "test_batch~I1001")
+        self.assertEqual(changes[1].revision, "rev1001")
+        self.assertEqual(changes[1].files[0].filename, "src/file_modified")
+        self.assertEqual(changes[1].files[0].base_contents, ["file_modified base line 1\n"])
+        self.assertEqual(changes[1].files[0].patch_contents, ["file_modified patched line 1\n"])
+
     def test_publish_review(self):
         """Test whether the Context.publish_review() method posts the data to the right URL"""
         review_input = ReviewInput("test_publish_review")